@@ -1,20 +1,25 @@
 """Agent Class"""
 
+import math
 import numpy as np
-from shapely.geometry import Polygon, Point
 from typing import List, Tuple
+from scipy.spatial import cKDTree
 from .parameters import ForceParameters, C1Parameters, H1Parameters, C2H2Parameters, AllForceParameters
-from .utils import angle_between
+from .environment import Environment
+from .forces_nb import F_bi_ci, F_bi_ci_all
+from .utils import cosines_between, random_units
 from .forces import (
-    F_ai,
     F_bi,
     F_ci,
+    F_bi_ci_batch,
     F_wi,
+    F_wi_batch,
     F_eik,
     F_fik,
     F_gi,
     F_hi,
     F_31,
+    neighbor_geometry,
     h1_func,
     h2_func,
     c1_func,
@@ -22,13 +27,22 @@ from .forces import (
 )
 import logging
 
-# Configure logging
-logging.basicConfig(
-    filename="debug_forces.log",
-    filemode="w",
-    format="%(asctime)s - %(message)s",
-    level=logging.INFO,
-)
+logger = logging.getLogger(__name__)
+DEBUG_AGENT_ID = 0  # agent whose forces are logged, see setup_debug_logging
+
+
+def setup_debug_logging(filename: str = "debug_forces.log"):
+    """Write the forces acting on agent DEBUG_AGENT_ID to a log file.
+
+    Call before creating the agents. Logging is skipped entirely under
+    `python -O`.
+    """
+    logging.basicConfig(
+        filename=filename,
+        filemode="w",
+        format="%(asctime)s - %(message)s",
+        level=logging.INFO,
+    )
 
 
 class Agent:
@@ -39,7 +53,8 @@ class Agent:
         velocity: List[float],
         mass: float = 80.0,
         damping: float = 0.5,
-        params: AllForceParameters = None        
+        params: AllForceParameters = None,
+        copy: bool = True,
     ):
         """Create a new agent.
 
@@ -48,16 +63,23 @@ class Agent:
             velocity: Initial velocity as [vx, vy].
             mass: Agent mass.
             damping: Viscous damping coefficient.
+            copy: If False, float arrays given as position and velocity are
+                used as they are, e.g. rows of the arrays of an AgentPool.
         """
         self.id = agent_id
-        self.x = np.array(position, dtype=float)
-        self.v = np.array(velocity, dtype=float)
+        as_array = np.array if copy else np.asarray
+        self.x = as_array(position, dtype=float)
+        self.v = as_array(velocity, dtype=float)
         self.m = mass
         self.nu = damping
         self.acc = np.zeros(2)
-        self.mem_signs = []
+        self.mem_signs = None  # memorized signs, boolean mask over the environment's signs
         self.last_exit_seen = 0
         self.params = params or AllForceParameters()
+        self._F_buf = np.empty(2)  # reused by compute_forces
+        self._log_forces = (
+            __debug__ and agent_id == DEBUG_AGENT_ID and logger.isEnabledFor(logging.INFO)
+        )
         
     def update(self, dt: float):
         """Update position and velocity using current acceleration."""
@@ -66,148 +88,442 @@ class Agent:
 
     def get_visible_signs(
         self,
-        signs=Tuple[List[np.ndarray], List[np.ndarray]],
+        sign_positions: np.ndarray,
+        sign_orientations: np.ndarray,
+        vision_radius: float,
+        fov_angle: float,
         sign_fov_angle: float = np.pi * 0.5,
-    ) -> List[np.ndarray]:
+    ) -> np.ndarray:
         """Check which signs are visible to the agent.
 
         A sign is considered visible if:
         - It is within the agent's vision radius and field of view (FOV).
         - The agent is also within the sign's field of influence cone (based on sign orientation).
-        """
-        visible_now = []
-        for P_k, o_k in signs:
-            r = P_k - self.x  # vector from agent to sign
-            dist = np.linalg.norm(r)
-
-            if dist <= self.params.force.sign_vision_radius:
-                # Agent's view toward the sign
-                angle_agent = angle_between(self.v, r)
 
-                # Sign's orientation vector (sign toward agent)
-                sign_to_agent = -r
-                angle_sign = angle_between(o_k, sign_to_agent)
+        Args:
+            sign_positions: Positions of the signs, shape (K, 2).
+            sign_orientations: Orientations of the signs, shape (K, 2).
+            vision_radius: Maximum distance at which the agent sees a sign.
+            fov_angle: Field of view of the agent.
+            sign_fov_angle: Opening angle of the sign's field of influence.
 
-                if (
-                    angle_agent <= self.params.force.fov_angle / 2
-                    and angle_sign <= sign_fov_angle / 2
-                ):
-                    visible_now.append(P_k)
+        Returns:
+            np.ndarray: Indices of the visible signs in sign_positions.
+        """
+        r = sign_positions - self.x  # vectors from agent to signs
+        dist = np.hypot(r[:, 0], r[:, 1])
+        in_range = dist <= vision_radius
+        r = r[in_range]
+        # angle <= fov / 2  <=>  cos(angle) >= cos(fov / 2) for angles in [0, pi]
+        # Agent's view toward the signs
+        cos_agent = cosines_between(self.v, r)
+        # Signs' orientation vectors (sign toward agent)
+        cos_sign = cosines_between(sign_orientations[in_range], -r)
 
-        return visible_now
+        visible = (cos_agent >= np.cos(fov_angle / 2)) & (
+            cos_sign >= np.cos(sign_fov_angle / 2)
+        )
+        return np.flatnonzero(in_range)[visible]
 
     def compute_forces(
         self,
-        others: List[Tuple[np.ndarray, np.ndarray]],
-        polygons: List[Polygon],
-        signs: Tuple[List[np.ndarray], List[np.ndarray]],
-        exits: List[Polygon],
+        X_others: np.ndarray,
+        V_others: np.ndarray,
+        env: Environment,
         x_panic: np.ndarray,
+        n_others: int = None,
+        use_numba: bool = False,
+        pair_forces: Tuple[np.ndarray, np.ndarray] = None,
+        unit_noise: np.ndarray = None,
     ):
         """Compute total force acting on the agent using the model equations.
 
         Equations used: (2) to (11) from Hirai and Tarui's model.
 
         Args:
-            others: List of other agents as (position, velocity).
-            polygons: List of polygons representing walls and obstacles.
-            signs: Positions of visible signs.
-            exits: Exit areas as polygons.
-            h_i: External influence (herding).
+            X_others: Positions of the neighboring agents, shape (M, 2).
+            V_others: Velocities of the neighboring agents, shape (M, 2).
+            env: Walls, exits and signs of the simulation.
+            x_panic: Position of the panic site.
+            n_others: Number of other agents used to normalize the cohesion
+                force. Defaults to M, i.e. the neighbors are all other agents.
+            use_numba: Compute F_bi and F_ci with the numba kernel instead of
+                NumPy (see forces_nb.HAS_NUMBA).
+            pair_forces: Precomputed (f_bi, f_ci). If given, X_others and
+                V_others are not used.
+            unit_noise: Random unit vector of the fluctuation force F_31.
+                Drawn by F_31 if not given.
         """
-        f_ai = F_ai(self.v, a=self.params.force.a)
-        f_bi = F_bi(
-            self.x, self.v, others, c1_func, c2_func, self.params.c1, self.params.c2h2
-        )
-        f_ci = F_ci(
-            self.x, self.v, others, h1_func, h2_func, self.params.h1, self.params.c2h2
-        )
+        params = self.params
+        fp = params.force
+        d_wall, vision_radius = fp.wall_distance, fp.sign_vision_radius
+        fov, sign_fov = fp.fov_angle, fp.sign_fov_angle
+
+        v_norm = math.hypot(*self.v)
+        v_hat = self.v / v_norm if v_norm > 0 else np.zeros(2)
+        f_ai = fp.a * v_hat  # F_ai, equation (2)
+        if pair_forces is not None:
+            f_bi, f_ci = pair_forces
+        elif use_numba:
+            f_bi, f_ci = F_bi_ci(
+                self.x, self.v, X_others, V_others, params, n_others=n_others
+            )
+        else:
+            # offsets, distances and angles of the neighbors, shared by F_bi and F_ci
+            geometry = neighbor_geometry(self.x, v_hat, X_others)
+            f_bi = F_bi(
+                self.x,
+                self.v,
+                X_others,
+                c1_func,
+                c2_func,
+                params.c1,
+                params.c2h2,
+                geometry=geometry,
+            )
+            f_ci = F_ci(
+                self.x,
+                self.v,
+                X_others,
+                V_others,
+                h1_func,
+                h2_func,
+                params.h1,
+                params.c2h2,
+                n_others=n_others,
+                geometry=geometry,
+            )
 
-        f_wi, e_w = F_wi(
+        f_wi, e_w, di = F_wi(
             self.x,
             self.v,
-            polygons,
-            d=self.params.force.wall_distance,
-            w0=self.params.force.wall_strength_into,
-            w1=self.params.force.wall_strength_always,
+            env.segment_starts,
+            env.segment_ends,
+            d=d_wall,
+            w0=fp.wall_strength_into,
+            w1=fp.wall_strength_always,
+            tree=env.wall_tree,
+            reach=env.segment_reach,
         )
         # ------------------- signs and exits
-        exit_centers = [np.array(exit.centroid.coords[0]) for exit in exits]
-        exit_distances = [np.linalg.norm(self.x - c) for c in exit_centers]
-        min_exit_dist = exit_distances[self.last_exit_seen]
-        self.last_exit_seen = np.argmin(
-            [np.linalg.norm(self.x - c) for c in exit_centers]
-        )
+        # closest exit from the squared distances, one square root
+        to_exits = env.exit_centers - self.x
+        exit_d2 = np.einsum("ij,ij->i", to_exits, to_exits)
+        self.last_exit_seen = int(exit_d2.argmin())
+        min_exit_dist = math.sqrt(exit_d2[self.last_exit_seen])
 
-        if min_exit_dist <= self.params.force.exit_domain_radius:
+        if min_exit_dist <= fp.exit_domain_radius:
             # Close to exit → apply only F_gi
             f_gi = F_gi(
-                self.x, [exits[self.last_exit_seen]], strength=self.params.force.exit_strength
+                self.x, env.exit_centers[self.last_exit_seen], strength=fp.exit_strength
             )
             f_eik = np.zeros(2)
             f_fik = np.zeros(2)
         else:
-            visible_now = self.get_visible_signs(signs)
+            near = env.signs_within(self.x, vision_radius)
+            sign_positions = env.sign_positions[near]
+            sign_orientations = env.sign_orientations[near]
+            visible_now = near[
+                self.get_visible_signs(
+                    sign_positions, sign_orientations, vision_radius, fov, sign_fov
+                )
+            ]
             f_gi = np.zeros(2)
             # Memorize visible signs
-            for P_k in visible_now:
-                if not any(np.allclose(P_k, mem) for mem in self.mem_signs):
-                    self.mem_signs.append(P_k)
+            n_signs = len(env.sign_positions)
+            if self.mem_signs is None or len(self.mem_signs) != n_signs:
+                self.mem_signs = np.zeros(n_signs, dtype=bool)
+            self.mem_signs[visible_now] = True
 
             # Choose between visible-sign force and memorized-sign force (never both)
-            if visible_now:
+            if len(visible_now):
                 f_eik = F_eik(
                     self.x,
                     self.v,
-                    signs,
-                    eta=self.params.force.eta_sign,
-                    vision_radius=self.params.force.sign_vision_radius,
-                    fov_angle=self.params.force.fov_angle,
+                    env.sign_positions[visible_now],
+                    env.sign_orientations[visible_now],
+                    eta=fp.eta_sign,
+                    vision_radius=vision_radius,
+                    fov_angle=fov,
+                    sign_fov=sign_fov,
                 )
                 f_fik = np.zeros(2)
             else:
                 f_eik = np.zeros(2)
-                f_fik = F_fik(self.x, self.mem_signs, eta=self.params.force.eta_mem)
+                f_fik = F_fik(self.x, env.sign_positions[self.mem_signs], eta=fp.eta_mem)
         # ------------ signs and exits
 
-        f_hi = F_hi(self.x, x_panic, self.params.force.hi, self.params.force.cutoff_hi)
-
-        di = (
-            min([wall.exterior.distance(Point(self.x)) for wall in polygons])
-            if polygons
-            else 1.0
-        )
+        f_hi = F_hi(self.x, x_panic, fp.hi, fp.cutoff_hi)
 
         bwi = np.dot(f_wi, e_w)
         f_31 = F_31(
             di,
             bwi,
-            q1=self.params.force.q1,
-            q2=self.params.force.q2,
-            d=self.params.force.wall_distance,
+            q1=fp.q1,
+            q2=fp.q2,
+            d=d_wall,
+            unit=unit_noise,
         )
 
-        F11 = f_ai + f_bi + f_ci
-        F21 = f_wi + f_eik + f_fik + f_gi + f_hi
-        F_total = F11 + F21 + f_31
+        # F_total = F11 + F21 + F31, summed in place into a reused buffer with
+        # F11 = f_ai + f_bi + f_ci and F21 = f_wi + f_eik + f_fik + f_gi + f_hi
+        F_total = np.add(f_ai, f_bi, out=self._F_buf)
+        for f in (f_ci, f_wi, f_eik, f_fik, f_gi, f_hi, f_31):
+            np.add(F_total, f, out=F_total)
         # debug all forces
-        debug = 1
-        id_debug = 0
-        if debug and self.id == id_debug and self.x[0] > 6.5 and self.x[0] < 6.8:
-            logging.info(f"id {self.id}: {self.x = }")
-            # logging.debug(f"{self.last_exit_seen = }, {self.mem_signs = }")
-            logging.info(f"f_ai: {f_ai}")
-            logging.info(f"f_bi: {f_bi}")
-            logging.info(f"f_ci: {f_ci}")
-            logging.info(f"f_wi: {f_wi}")
-            logging.info(f"f_eik: {f_eik}")
-            logging.info(f"f_fik: {f_fik}")
-            logging.info(f"f_gi: {f_gi}")
-            logging.info(f"f_hi: {f_hi}")
-            logging.info(f"f_31: {f_31}")
-            logging.info(f"F11: {F11}")
-            logging.info(f"F21: {F21}")
-            logging.info(f"F_total: {F_total}")
-            logging.info("-----------------------------")
-
-        self.acc = (F_total - self.nu * self.v) / self.m
+        if self._log_forces and 6.5 < self.x[0] < 6.8:
+            logger.info("id %s: self.x = %s", self.id, self.x)
+            # logger.debug("%s, %s", self.last_exit_seen, self.mem_signs)
+            logger.info("f_ai: %s", f_ai)
+            logger.info("f_bi: %s", f_bi)
+            logger.info("f_ci: %s", f_ci)
+            logger.info("f_wi: %s", f_wi)
+            logger.info("f_eik: %s", f_eik)
+            logger.info("f_fik: %s", f_fik)
+            logger.info("f_gi: %s", f_gi)
+            logger.info("f_hi: %s", f_hi)
+            logger.info("f_31: %s", f_31)
+            logger.info("F11: %s", f_ai + f_bi + f_ci)
+            logger.info("F21: %s", f_wi + f_eik + f_fik + f_gi + f_hi)
+            logger.info("F_total: %s", F_total)
+            logger.info("-----------------------------")
+
+        F_total -= self.nu * self.v
+        np.divide(F_total, self.m, out=self.acc)
+
+
+class AgentPool:
+    def __init__(
+        self,
+        positions: np.ndarray,
+        velocities: np.ndarray,
+        mass: float = 80.0,
+        damping: float = 0.5,
+        params: AllForceParameters = None,
+        seed: int = None,
+    ):
+        """Create a population of agents stored as struct-of-arrays.
+
+        Positions, velocities and accelerations of all agents are kept in
+        contiguous (N, 2) arrays. The `Agent` objects in `self.agents` are
+        thin views on row i of these arrays.
+
+        Args:
+            positions: Initial positions, shape (N, 2).
+            velocities: Initial velocities, shape (N, 2) or (2,) for all agents.
+            mass: Agent mass, scalar or shape (N,).
+            damping: Viscous damping coefficient, scalar or shape (N,).
+            seed: Seed of the random generator of the fluctuation force.
+        """
+        self.X = np.array(positions, dtype=float).reshape(-1, 2)
+        n = len(self.X)
+        self.V = np.array(np.broadcast_to(np.asarray(velocities, dtype=float), (n, 2)))
+        self.A = np.zeros((n, 2))
+        self.mass = np.array(np.broadcast_to(mass, n), dtype=float)
+        self.nu = np.array(np.broadcast_to(damping, n), dtype=float)
+        self.active = np.ones(n, dtype=bool)
+        self.params = params or AllForceParameters()
+        self.rng = np.random.default_rng(seed)
+        # state of the signs and exits used by step(), one row per agent
+        self.mem_signs = None  # (N, K) memorized signs, see sign_memory
+        self.last_exit_seen = np.zeros(n, dtype=int)
+
+        self.agents = []
+        for i in range(n):
+            # share memory with the pool instead of owning copies
+            agent = Agent(
+                i, self.X[i], self.V[i], self.mass[i], self.nu[i], self.params, copy=False
+            )
+            agent.acc = self.A[i]
+            self.agents.append(agent)
+
+    def __len__(self) -> int:
+        return len(self.X)
+
+    def sign_memory(self, n_signs: int) -> np.ndarray:
+        """Return the memorized signs of all agents, shape (N, n_signs).
+
+        Row i is shared with agents[i].mem_signs, so the memory is the same
+        whether the forces are computed by compute_forces or compute_all_forces.
+        Signs an agent memorized on its own are kept.
+        """
+        if self.mem_signs is None or self.mem_signs.shape[1] != n_signs:
+            self.mem_signs = np.zeros((len(self), n_signs), dtype=bool)
+            for i, agent in enumerate(self.agents):
+                if agent.mem_signs is not None and len(agent.mem_signs) == n_signs:
+                    self.mem_signs[i] = agent.mem_signs
+                agent.mem_signs = self.mem_signs[i]
+        return self.mem_signs
+
+    def update(self, dt: float):
+        """Update positions and velocities of all active agents."""
+        active = self.active
+        self.V[active] += dt * self.A[active]
+        self.X[active] += dt * self.V[active]
+
+    def compute_forces(self, env: Environment, x_panic: np.ndarray, use_numba: bool = False):
+        """Compute the accelerations of all active agents in a few array expressions.
+
+        Same model as Agent.compute_forces, but every force is evaluated for
+        all active agents at once on a single snapshot of X and V.
+
+        Args:
+            env: Walls, exits and signs of the simulation.
+            x_panic: Position of the panic site.
+            use_numba: Compute F_bi and F_ci with forces_nb.bi_ci_all.
+        """
+        fp = self.params.force
+        idx = np.flatnonzero(self.active)
+        X, V = self.X[idx], self.V[idx]
+        n = len(idx)
+        if n == 0:
+            return
+
+        v_norm = np.hypot(V[:, 0], V[:, 1])[:, None]
+        V_hat = np.divide(V, v_norm, out=np.zeros_like(V), where=v_norm > 0)
+        F_a = fp.a * V_hat  # F_ai, equation (2)
+
+        neighbor_idx, neighbor_offsets = neighbor_csr(X, self.params.interaction_radius)
+        if use_numba:
+            F_b, F_c = F_bi_ci_all(X, V, neighbor_idx, neighbor_offsets, self.params)
+        else:
+            F_b, F_c = F_bi_ci_batch(X, V, V_hat, neighbor_idx, neighbor_offsets, self.params)
+
+        F_w, E_w, di = F_wi_batch(
+            X,
+            V,
+            env.segment_starts,
+            env.segment_ends,
+            env.wall_tree,
+            d=fp.wall_distance,
+            w0=fp.wall_strength_into,
+            w1=fp.wall_strength_always,
+            reach=env.segment_reach,
+        )
+
+        # ------------------- signs and exits
+        to_exits = env.exit_centers[None, :, :] - X[:, None, :]  # (n, E, 2)
+        exit_d2 = np.einsum("nej,nej->ne", to_exits, to_exits)
+        last_exit = exit_d2.argmin(axis=1)
+        self.last_exit_seen[idx] = last_exit
+        rows = np.arange(n)
+        min_exit_dist = np.sqrt(exit_d2[rows, last_exit])
+        at_exit = min_exit_dist <= fp.exit_domain_radius
+        # F_gi: attraction toward the closest exit, only close to it
+        F_g = np.zeros((n, 2))
+        F_g[at_exit] = F_gi(
+            X[at_exit], env.exit_centers[last_exit[at_exit]], strength=fp.exit_strength
+        )
+
+        mem_signs = self.sign_memory(len(env.sign_positions))
+        to_signs = env.sign_positions[None, :, :] - X[:, None, :]  # (n, K, 2)
+        sign_dist = np.hypot(to_signs[..., 0], to_signs[..., 1])
+        sign_dirs = np.divide(
+            to_signs,
+            sign_dist[..., None],
+            out=np.zeros_like(to_signs),
+            where=sign_dist[..., None] > 0,
+        )
+        # visible: in range, in the agent's field of view and in the sign's cone
+        visible = (
+            (sign_dist <= fp.sign_vision_radius)
+            & (cosines_between(V[:, None, :], to_signs) >= np.cos(fp.fov_angle / 2))
+            & (
+                cosines_between(env.sign_orientations[None], -to_signs)
+                >= np.cos(fp.sign_fov_angle / 2)
+            )
+        )
+        visible &= ~at_exit[:, None]
+        mem = mem_signs[idx] | visible
+        mem_signs[idx] = mem
+        # visible signs attract, otherwise the memorized ones (never both)
+        sees_sign = visible.any(axis=1)
+        F_e = fp.eta_sign * np.einsum("nk,nkj->nj", visible, sign_dirs)
+        use_mem = ~at_exit & ~sees_sign
+        F_f = fp.eta_mem * np.einsum("nk,nkj->nj", mem & use_mem[:, None], sign_dirs)
+        # ------------ signs and exits
+
+        from_panic = X - np.asarray(x_panic, dtype=float)
+        panic_dist = np.hypot(from_panic[:, 0], from_panic[:, 1])[:, None]
+        F_h = np.zeros((n, 2))
+        np.divide(
+            fp.hi * from_panic,
+            panic_dist,
+            out=F_h,
+            where=(panic_dist > 0) & (panic_dist <= fp.cutoff_hi),
+        )
+
+        bwi = np.einsum("ij,ij->i", F_w, E_w)
+        F_noise = F_31(
+            di, bwi, q1=fp.q1, q2=fp.q2, d=fp.wall_distance, unit=random_units(n, self.rng)
+        )
+
+        F_total = F_a + F_b + F_c + F_w + F_e + F_f + F_g + F_h + F_noise
+        self.A[idx] = (F_total - self.nu[idx, None] * V) / self.mass[idx, None]
+
+    def step(
+        self, dt: float, env: Environment, x_panic: np.ndarray, use_numba: bool = False
+    ):
+        """Advance all active agents by one time step, see compute_forces."""
+        self.compute_forces(env, x_panic, use_numba=use_numba)
+        self.update(dt)
+
+
+def neighbor_csr(X: np.ndarray, radius: float) -> Tuple[np.ndarray, np.ndarray]:
+    """Find the neighbors within radius of every point, excluding itself.
+
+    Returns:
+        (neighbor_idx, neighbor_offsets): The neighbors of point i are
+        neighbor_idx[neighbor_offsets[i]:neighbor_offsets[i + 1]].
+    """
+    pairs = cKDTree(X).query_pairs(radius, output_type="ndarray")
+    rows = np.concatenate([pairs[:, 0], pairs[:, 1]])
+    cols = np.concatenate([pairs[:, 1], pairs[:, 0]])
+    order = np.argsort(rows, kind="stable")
+    neighbor_offsets = np.searchsorted(rows[order], np.arange(len(X) + 1))
+    return cols[order], neighbor_offsets
+
+
+def compute_all_forces(
+    pool: AgentPool, env: Environment, x_panic: np.ndarray, use_numba: bool = False
+):
+    """Compute the accelerations of all active agents in the pool.
+
+    All agents see the same snapshot of positions and velocities, so the
+    result does not depend on the order in which agents are processed.
+    c1 and h1 vanish beyond `params.interaction_radius`, hence only the
+    neighbors found by a KD-tree query within that radius are considered.
+    With use_numba, F_bi and F_ci of all agents are computed in parallel
+    by `forces_nb.bi_ci_all`. The remaining forces are computed by
+    Agent.compute_forces, one agent at a time in a Python loop;
+    AgentPool.step evaluates the same forces without that loop.
+    """
+    idx = np.flatnonzero(pool.active)
+    X, V = pool.X[idx], pool.V[idx]
+    neighbor_idx, neighbor_offsets = neighbor_csr(X, pool.params.interaction_radius)
+    if use_numba:
+        F_b, F_c = F_bi_ci_all(X, V, neighbor_idx, neighbor_offsets, pool.params)
+    pool.sign_memory(len(env.sign_positions))  # shared with the agents
+    # one batch of random directions for the fluctuation force of all agents
+    U = random_units(len(idx), pool.rng)
+
+    for k, i in enumerate(idx):
+        if use_numba:
+            pool.agents[i].compute_forces(
+                None,
+                None,
+                env,
+                x_panic,
+                pair_forces=(F_b[k], F_c[k]),
+                unit_noise=U[k],
+            )
+        else:
+            others = neighbor_idx[neighbor_offsets[k] : neighbor_offsets[k + 1]]
+            pool.agents[i].compute_forces(
+                X[others],
+                V[others],
+                env,
+                x_panic,
+                n_others=len(idx) - 1,
+                unit_noise=U[k],
+            )
@@ -0,0 +1,69 @@
+"""Simulation Environment"""
+
+import numpy as np
+import shapely
+from scipy.spatial import cKDTree
+from shapely.geometry import Polygon
+from typing import List, Tuple
+
+from .forces import segment_reach
+from .utils import extract_segment_arrays
+
+
+class Environment:
+    def __init__(
+        self,
+        walls: List[Polygon],
+        exits: List[Polygon],
+        signs: List[Tuple[np.ndarray, np.ndarray]],
+    ):
+        """Hold the static geometry of a simulation.
+
+        Everything derived from the geometry is computed once here and
+        shared by all agents and time steps.
+
+        Args:
+            walls: List of polygons representing walls and obstacles.
+            exits: Exit areas as polygons.
+            signs: List of signs as (position, orientation).
+        """
+        self.walls = walls
+        segments = [extract_segment_arrays(polygon) for polygon in walls]
+        self.segment_starts = np.concatenate(
+            [starts for starts, _ in segments] + [np.zeros((0, 2))]
+        )
+        self.segment_ends = np.concatenate(
+            [ends for _, ends in segments] + [np.zeros((0, 2))]
+        )
+        # broad phase of the wall forces, see forces.segment_reach
+        midpoints = (self.segment_starts + self.segment_ends) / 2
+        self.segment_reach = segment_reach(self.segment_starts, self.segment_ends)
+        self.wall_tree = cKDTree(midpoints) if len(midpoints) else None
+        self.exits = exits
+        for exit in exits:
+            shapely.prepare(exit)  # speeds up the repeated in_exits tests
+        self.exit_centers = np.array(
+            [exit.centroid.coords[0] for exit in exits], dtype=float
+        ).reshape(-1, 2)
+        self.signs = list(signs)
+        self.sign_positions = np.array(
+            [position for position, _ in self.signs], dtype=float
+        ).reshape(-1, 2)
+        self.sign_orientations = np.array(
+            [orientation for _, orientation in self.signs], dtype=float
+        ).reshape(-1, 2)
+        self.sign_tree = cKDTree(self.sign_positions)
+
+    def in_exits(self, X: np.ndarray) -> np.ndarray:
+        """Return a boolean mask of the points of X, shape (N, 2), inside an exit."""
+        X = np.asarray(X, dtype=float).reshape(-1, 2)
+        inside = np.zeros(len(X), dtype=bool)
+        for exit in self.exits:
+            inside |= shapely.contains_xy(exit, X[:, 0], X[:, 1])
+        return inside
+
+    def signs_within(self, x: np.ndarray, radius: float) -> np.ndarray:
+        """Return the indices of the signs at distance <= radius from x."""
+        if not self.signs:
+            return np.zeros(0, dtype=int)
+        return np.array(self.sign_tree.query_ball_point(x, radius), dtype=int)
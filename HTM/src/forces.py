@@ -1,35 +1,32 @@
 """Interaction Functions"""
 
+import math
 import numpy as np
-from shapely.geometry import Polygon, Point
-from typing import List, Tuple
+from scipy.spatial import cKDTree
+from typing import Tuple
 
-from .utils import normalize, angle_between, extract_segments, random_unit
-from .parameters import C1Parameters, H1Parameters, C2H2Parameters
+from .utils import normalize, cosines_between, point_to_segments, random_unit
+from .parameters import C1Parameters, H1Parameters, C2H2Parameters, AllForceParameters
+
+
+# The functions below are piecewise linear, so they are evaluated exactly by
+# np.interp on a table of their breakpoints, in a single pass over r or phi.
+# The breakpoints must be ordered, e.g. beta < nu <= gamma < epsilon.
 
 
 # --- c1(r_ij): distance-based repulsion
 def c1_func(r, nu=1.0, cn0=-0.5, cr0=1.0, beta=0.5, gamma=2.0, epsilon=3.0):
-    if r < beta:
-        return cn0 + (0 - cn0) * (r / beta)
-    elif r < nu:
-        return cr0 * (r - beta) / (nu - beta)
-    elif r < gamma:
-        return cr0
-    elif r < epsilon:
-        return cr0 * (1 - (r - gamma) / (epsilon - gamma))
-    else:
-        return 0.0
+    return np.interp(r, (0.0, beta, nu, gamma, epsilon), (cn0, 0.0, cr0, cr0, 0.0))
 
 
 # --- h1(r_ij): distance-based cohesion
 def h1_func(r, hr0=1.0, lam=2.0, sigma=3.0):
-    if r < lam:
-        return hr0
-    elif r < sigma:
-        return hr0 * (1 - (r - lam) / (sigma - lam))
-    else:
-        return 0.0
+    return np.interp(r, (lam, sigma), (hr0, 0.0))
+
+
+def _angular_func(phi, f1, f2, phi1, phi2, phi3, phi4):
+    """f1 up to phi1, down to f2 at phi2, f2 up to phi3, down to 0 at phi4."""
+    return np.interp(phi, (phi1, phi2, phi3, phi4), (f1, f2, f2, 0.0))
 
 
 # --- c2(phi_ij): angle-based repulsion
@@ -42,16 +39,7 @@ def c2_func(
     phi3=2 * np.pi / 3,
     phi4=5 * np.pi / 6,
 ):
-    if phi < phi1:
-        return cphi1
-    elif phi < phi2:
-        return cphi1 - (cphi1 - cphi2) * (phi - phi1) / (phi2 - phi1)
-    elif phi < phi3:
-        return cphi2
-    elif phi < phi4:
-        return cphi2 * (1 - (phi - phi3) / (phi4 - phi3))
-    else:
-        return 0.0
+    return _angular_func(phi, cphi1, cphi2, phi1, phi2, phi3, phi4)
 
 
 # --- h2(phi_ij): angle-based cohesion (same structure as c2)
@@ -64,26 +52,44 @@ def h2_func(
     phi3=2 * np.pi / 3,
     phi4=5 * np.pi / 6,
 ):
-    if phi < phi1:
-        return hphi1
-    elif phi < phi2:
-        return hphi1 - (hphi1 - hphi2) * (phi - phi1) / (phi2 - phi1)
-    elif phi < phi3:
-        return hphi2
-    elif phi < phi4:
-        return hphi2 * (1 - (phi - phi3) / (phi4 - phi3))
-    else:
-        return 0.0
+    return _angular_func(phi, hphi1, hphi2, phi1, phi2, phi3, phi4)
+
+
+def neighbor_geometry(x_i: np.ndarray, v_hat: np.ndarray, X_others: np.ndarray):
+    """Offsets, distances and view angles of all neighbors of agent i.
+
+    Neighbors located exactly at x_i are dropped. The result is shared by
+    F_bi and F_ci, see their `geometry` argument.
+
+    Args:
+        v_hat: Unit velocity of agent i, or zero if agent i is at rest.
+
+    Returns:
+        (R, dist, phi, mask): R = X_others - x_i, the distances and angles
+        between v_i and R for the kept neighbors, and the boolean mask
+        selecting them.
+    """
+    R = X_others - x_i
+    dist = np.hypot(R[:, 0], R[:, 1])
+    mask = dist > 0
+    R, dist = R[mask], dist[mask]
+    # angle from |cross| and dot as in angle_between; 0 if v_hat vanishes
+    phi = np.arctan2(np.abs(R[:, 0] * v_hat[1] - R[:, 1] * v_hat[0]), R @ v_hat + 0.0)
+    return R, dist, phi, mask
 
 
 def F_ci(
     x_i: np.ndarray,
     v_i: np.ndarray,
-    others: List[Tuple[np.ndarray, np.ndarray]],
+    X_others: np.ndarray,
+    V_others: np.ndarray,
     h1_func,
     h2_func,
     h1params: H1Parameters,
     c2h2params: C2H2Parameters,
+    n_others: int = None,
+    v_hat: np.ndarray = None,
+    geometry: Tuple = None,
 ) -> np.ndarray:
     """
     Equation (5): Cohesion force based on velocity alignment.
@@ -95,48 +101,52 @@ def F_ci(
     Args:
         x_i: Position of agent i
         v_i: Velocity of agent i
-        others: List of (x_j, v_j)
+        X_others: Positions of the other agents, shape (M, 2)
+        V_others: Velocities of the other agents, shape (M, 2)
         h1_func: function of distance
         h2_func: function of angle
+        n_others: Number M of other agents. Defaults to len(X_others); pass
+            it when X_others only holds the agents within the range of h1.
+        v_hat: normalize(v_i), if already known
+        geometry: neighbor_geometry(x_i, v_hat, X_others), if already known
 
     Returns:
         np.ndarray: Cohesion force vector
     """
-    force = np.zeros(2)
-    M = len(others)
-    if M == 0:
-        return force
-
-    for x_j, v_j in others:
-        r_ij = x_j - x_i
-        dist = np.linalg.norm(r_ij)
-        if dist > 0:
-            phi_ij = angle_between(v_i, r_ij)
-            h = h1_func(
-                dist, hr0=h1params.hr0, lam=h1params.lam, sigma=h1params.sigma
-            ) * h2_func(
-                phi_ij,
-                hphi1=c2h2params.hphi1,
-                hphi2=c2h2params.hphi2,
-                phi1=c2h2params.phi1,
-                phi2=c2h2params.phi2,
-                phi3=c2h2params.phi3,
-                phi4=c2h2params.phi4,
-            ) 
-            
-            force += h * (v_j - v_i)
+    M = len(X_others) if n_others is None else n_others
+    if len(X_others) == 0:
+        return np.zeros(2)
 
+    if geometry is None:
+        if v_hat is None:
+            v_hat = normalize(v_i)
+        geometry = neighbor_geometry(x_i, v_hat, X_others)
+    _, dist, phi, mask = geometry
+    h = h1_func(
+        dist, hr0=h1params.hr0, lam=h1params.lam, sigma=h1params.sigma
+    ) * h2_func(
+        phi,
+        hphi1=c2h2params.hphi1,
+        hphi2=c2h2params.hphi2,
+        phi1=c2h2params.phi1,
+        phi2=c2h2params.phi2,
+        phi3=c2h2params.phi3,
+        phi4=c2h2params.phi4,
+    )
+    force = h @ (V_others[mask] - v_i)
     return force / M
 
 
 def F_bi(
     x_i: np.ndarray,
     v_i: np.ndarray,
-    others: List[Tuple[np.ndarray, np.ndarray]],
+    X_others: np.ndarray,
     c1_func,
     c2_func,
     c1params: C1Parameters,
     c2h2params: C2H2Parameters,
+    v_hat: np.ndarray = None,
+    geometry: Tuple = None,
 ) -> np.ndarray:
     """
     Equation (4): Repulsion from surrounding individuals.
@@ -149,38 +159,107 @@ def F_bi(
     Args:
         x_i: Position of agent i
         v_i: Velocity of agent i
-        others: List of (x_j, v_j)
+        X_others: Positions of the other agents, shape (M, 2)
         c1_func: function of distance
         c2_func: function of angle
+        v_hat: normalize(v_i), if already known
+        geometry: neighbor_geometry(x_i, v_hat, X_others), if already known
 
     Returns:
         np.ndarray: Repulsion force vector
     """
-    force = np.zeros(2)
-    for x_j, _ in others:
-        r_ij = x_j - x_i
-        dist = np.linalg.norm(r_ij)
-        if dist > 0:
-            phi_ij = angle_between(v_i, r_ij)
-            c = c1_func(
-                dist,
-                nu=c1params.nu,
-                cn0=c1params.cn0,
-                cr0=c1params.cr0,
-                beta=c1params.beta,
-                gamma=c1params.gamma,
-                epsilon=c1params.epsilon,
-            ) * c2_func(
-                phi_ij,
-                cphi1=c2h2params.cphi1,
-                cphi2=c2h2params.cphi2,
-                phi1=c2h2params.phi1,
-                phi2=c2h2params.phi2,
-                phi3=c2h2params.phi3,
-                phi4=c2h2params.phi4,
-            )
-            force += c * (r_ij / dist)
-    return force
+    if len(X_others) == 0:
+        return np.zeros(2)
+
+    if geometry is None:
+        if v_hat is None:
+            v_hat = normalize(v_i)
+        geometry = neighbor_geometry(x_i, v_hat, X_others)
+    R, dist, phi, _ = geometry
+    c = c1_func(
+        dist,
+        nu=c1params.nu,
+        cn0=c1params.cn0,
+        cr0=c1params.cr0,
+        beta=c1params.beta,
+        gamma=c1params.gamma,
+        epsilon=c1params.epsilon,
+    ) * c2_func(
+        phi,
+        cphi1=c2h2params.cphi1,
+        cphi2=c2h2params.cphi2,
+        phi1=c2h2params.phi1,
+        phi2=c2h2params.phi2,
+        phi3=c2h2params.phi3,
+        phi4=c2h2params.phi4,
+    )
+    return (c / dist) @ R
+
+
+def F_bi_ci_batch(
+    X: np.ndarray,
+    V: np.ndarray,
+    V_hat: np.ndarray,
+    neighbor_idx: np.ndarray,
+    neighbor_offsets: np.ndarray,
+    params: AllForceParameters,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Equations (4) and (5) for all agents at once.
+
+    Same forces as F_bi and F_ci, evaluated over the flat list of all
+    (agent, neighbor) pairs and summed per agent. F_ci is normalized by the
+    number of other agents, N - 1.
+
+    Args:
+        X: Positions of all agents, shape (N, 2)
+        V: Velocities of all agents, shape (N, 2)
+        V_hat: Unit velocities, zero rows for agents at rest, shape (N, 2)
+        neighbor_idx: Concatenated neighbor indices of all agents
+        neighbor_offsets: Start of the neighbors of agent i in neighbor_idx,
+            shape (N + 1,)
+
+    Returns:
+        (F_b, F_c): Repulsion and cohesion forces, shape (N, 2) each
+    """
+    n = len(X)
+    F_b = np.zeros((n, 2))
+    F_c = np.zeros((n, 2))
+    if n < 2:
+        return F_b, F_c
+
+    rows = np.repeat(np.arange(n), np.diff(neighbor_offsets))
+    cols = np.asarray(neighbor_idx)
+    R = X[cols] - X[rows]
+    dist = np.hypot(R[:, 0], R[:, 1])
+    keep = dist > 0
+    rows, cols, R, dist = rows[keep], cols[keep], R[keep], dist[keep]
+    # angle from |cross| and dot as in angle_between; 0 for agents at rest
+    U = V_hat[rows]
+    phi = np.arctan2(
+        np.abs(R[:, 0] * U[:, 1] - R[:, 1] * U[:, 0]), np.einsum("ij,ij->i", R, U) + 0.0
+    )
+
+    c1p, h1p, c2h2 = params.c1, params.h1, params.c2h2
+    angles = dict(phi1=c2h2.phi1, phi2=c2h2.phi2, phi3=c2h2.phi3, phi4=c2h2.phi4)
+    c = c1_func(
+        dist,
+        nu=c1p.nu,
+        cn0=c1p.cn0,
+        cr0=c1p.cr0,
+        beta=c1p.beta,
+        gamma=c1p.gamma,
+        epsilon=c1p.epsilon,
+    ) * c2_func(phi, cphi1=c2h2.cphi1, cphi2=c2h2.cphi2, **angles)
+    h = h1_func(dist, hr0=h1p.hr0, lam=h1p.lam, sigma=h1p.sigma) * h2_func(
+        phi, hphi1=c2h2.hphi1, hphi2=c2h2.hphi2, **angles
+    )
+
+    b = (c / dist)[:, None] * R
+    dv = h[:, None] * (V[cols] - V[rows])
+    for k in range(2):
+        F_b[:, k] = np.bincount(rows, weights=b[:, k], minlength=n)
+        F_c[:, k] = np.bincount(rows, weights=dv[:, k], minlength=n)
+    return F_b, F_c / (n - 1)
 
 
 # --- Force Components ---
@@ -189,46 +268,137 @@ def F_ai(velocity: np.ndarray, a: float = 1.0) -> np.ndarray:
     return a * normalize(velocity)
 
 
+def segment_reach(segment_starts: np.ndarray, segment_ends: np.ndarray) -> float:
+    """Largest half length of the segments.
+
+    A segment is within distance d of a point only if its midpoint is within
+    d + segment_reach of it.
+    """
+    seg = segment_ends - segment_starts
+    return np.hypot(seg[:, 0], seg[:, 1]).max(initial=0.0) / 2
+
+
 def F_wi(
     x_i: np.ndarray,
     v_i: np.ndarray,
-    polygons: List[Polygon],
+    segment_starts: np.ndarray,
+    segment_ends: np.ndarray,
     d: float = 1.0,
     w0: float = 6.0,
     w1: float = 6.0,
+    tree: cKDTree = None,
+    reach: float = None,
 ) -> np.ndarray:
-    """Equation (6): Repulsive force from nearby walls or obstacles."""
-    point = Point(x_i)
-    min_dist = float("inf")
-    closest_wall = None
-    wall_segments = [
-        segment for polygon in polygons for segment in extract_segments(polygon)
-    ]
-
-    for segment in wall_segments:
-        dist = segment.distance(point)
-        if dist < min_dist:
-            min_dist = dist
-            closest_wall = segment
-
-    if closest_wall is not None and min_dist < d:
-        closest_point = closest_wall.interpolate(closest_wall.project(point))
-        e_w = normalize(x_i - np.array(closest_point.coords[0]))  # away from the wall
-        v_wi = -np.dot(v_i, e_w)  # sign convention from paper: into wall = positive
-        if v_wi > 0:
-            strength = (w0 * v_wi * (d - min_dist) / d) + w1
-        else:
-            strength = w1
-
-        return strength * e_w, e_w
-
-    return np.zeros(2), np.array([1.0, 0.0])  # arbitrary unit vector (not used)
+    """Equation (6): Repulsive force from nearby walls or obstacles.
+
+    Args:
+        segment_starts: First end points of the wall segments, shape (S, 2).
+        segment_ends: Second end points of the wall segments, shape (S, 2).
+        tree: Optional cKDTree over the segment midpoints. If given, only the
+            segments with a midpoint within d + reach of x_i are considered.
+        reach: Largest half length of the segments, computed if not given.
+
+    Returns:
+        (force, e_w, min_dist): The force, the unit vector pointing away from
+        the closest wall and the distance to it. min_dist is inf if no wall
+        segment is considered.
+    """
+    if tree is not None:
+        if reach is None:
+            reach = segment_reach(segment_starts, segment_ends)
+        candidates = np.sort(np.array(tree.query_ball_point(x_i, d + reach), dtype=int))
+        segment_starts = segment_starts[candidates]
+        segment_ends = segment_ends[candidates]
+
+    min_dist = np.inf
+    if len(segment_starts) > 0:
+        dists, closest_points = point_to_segments(x_i, segment_starts, segment_ends)
+        k = np.argmin(dists)
+        min_dist = dists[k]
+        if min_dist < d:
+            # away from the wall; min_dist is the norm of x_i - closest point
+            e_w = (x_i - closest_points[k]) / min_dist if min_dist > 0 else np.zeros(2)
+            v_wi = -np.dot(v_i, e_w)  # sign convention from paper: into wall = positive
+            if v_wi > 0:
+                strength = (w0 * v_wi * (d - min_dist) / d) + w1
+            else:
+                strength = w1
+
+            return strength * e_w, e_w, min_dist
+
+    # arbitrary unit vector (not used)
+    return np.zeros(2), np.array([1.0, 0.0]), min_dist
+
+
+def F_wi_batch(
+    X: np.ndarray,
+    V: np.ndarray,
+    segment_starts: np.ndarray,
+    segment_ends: np.ndarray,
+    tree: cKDTree = None,
+    d: float = 1.0,
+    w0: float = 6.0,
+    w1: float = 6.0,
+    reach: float = None,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Equation (6) for all agents at once, see F_wi.
+
+    Args:
+        X: Positions of all agents, shape (N, 2).
+        V: Velocities of all agents, shape (N, 2).
+        tree: Optional cKDTree over the segment midpoints, queried once for
+            all agents, see F_wi. Without it, every agent is tested against
+            every segment.
+        reach: Largest half length of the segments, computed if not given.
+
+    Returns:
+        (F_w, E_w, min_dist): Forces and unit vectors pointing away from the
+        closest wall, shape (N, 2), and the distances to it, shape (N,).
+        min_dist is inf for agents without a wall segment within d.
+    """
+    n = len(X)
+    F_w = np.zeros((n, 2))
+    E_w = np.tile([1.0, 0.0], (n, 1))  # arbitrary unit vector (not used)
+    min_dist = np.full(n, np.inf)
+    if tree is not None:
+        if reach is None:
+            reach = segment_reach(segment_starts, segment_ends)
+        candidates = tree.query_ball_point(X, d + reach)
+        counts = [len(c) for c in candidates]
+        agent_ids = np.repeat(np.arange(n), counts)
+        segment_ids = np.concatenate([np.zeros(0, dtype=int), *candidates]).astype(int)
+    else:
+        n_segments = len(segment_starts)
+        agent_ids = np.repeat(np.arange(n), n_segments)
+        segment_ids = np.tile(np.arange(n_segments), n)
+    if len(agent_ids) == 0:
+        return F_w, E_w, min_dist
+
+    dists, closest_points = point_to_segments(
+        X[agent_ids], segment_starts[segment_ids], segment_ends[segment_ids]
+    )
+    # closest segment of each agent, ties going to the lowest segment index
+    order = np.lexsort((segment_ids, dists, agent_ids))
+    first = order[np.r_[True, agent_ids[order][1:] != agent_ids[order][:-1]]]
+    min_dist[agent_ids[first]] = dists[first]
+    first = first[dists[first] < d]
+    ids = agent_ids[first]
+
+    away = X[ids] - closest_points[first]
+    norm = np.hypot(away[:, 0], away[:, 1])[:, None]
+    e_w = np.divide(away, norm, out=np.zeros_like(away), where=norm > 0)
+    v_wi = -np.einsum("ij,ij->i", V[ids], e_w)  # into wall = positive
+    strength = np.where(v_wi > 0, w0 * v_wi * (d - min_dist[ids]) / d + w1, w1)
+    F_w[ids] = strength[:, None] * e_w
+    E_w[ids] = e_w
+    return F_w, E_w, min_dist
 
 
 def F_eik(
     x_i: np.ndarray,
     v_i: np.ndarray,
-    signs: List[Tuple[np.ndarray, np.ndarray]],
+    sign_positions: np.ndarray,
+    sign_orientations: np.ndarray,
     eta: float = 1.0,
     vision_radius: float = 1.5,
     fov_angle: float = np.pi * 2 / 3,  # agent's field of view
@@ -240,47 +410,50 @@ def F_eik(
     - the agent is within the sign's vision radius
     - the agent is within the sign's directional cone
     - the sign is within the agent's field of view
-    """
-    force = np.zeros(2)
-    for sign_position, sign_direction in signs:
-        to_agent = x_i - sign_position
-        to_sign = sign_position - x_i
-
-        dist = np.linalg.norm(to_agent)
-        if dist > vision_radius:
-            continue
-
-        angle_agent_to_sign = angle_between(sign_direction, to_agent)
-        angle_sign_to_agent = angle_between(v_i, to_sign)
-
-        if angle_agent_to_sign <= sign_fov / 2 and angle_sign_to_agent <= fov_angle / 2:
-            force += eta * normalize(sign_position - x_i)
-
-    return force
 
-
-def F_fik(x_i: np.ndarray, mem_signs: List[np.ndarray], eta: float = 1.0) -> np.ndarray:
+    Args:
+        sign_positions: Positions of the signs, shape (K, 2).
+        sign_orientations: Orientations of the signs, shape (K, 2).
+    """
+    to_sign = np.asarray(sign_positions, dtype=float).reshape(-1, 2) - x_i
+    dist = np.hypot(to_sign[:, 0], to_sign[:, 1])
+    # angle <= fov / 2  <=>  cos(angle) >= cos(fov / 2) for angles in [0, pi]
+    cos_sign = cosines_between(sign_orientations, -to_sign)
+    cos_agent = cosines_between(v_i, to_sign)
+    visible = (
+        (dist > 0)
+        & (dist <= vision_radius)
+        & (cos_sign >= np.cos(sign_fov / 2))
+        & (cos_agent >= np.cos(fov_angle / 2))
+    )
+    return eta * ((1 / dist[visible]) @ to_sign[visible])
+
+
+def F_fik(x_i: np.ndarray, mem_signs: np.ndarray, eta: float = 1.0) -> np.ndarray:
     """Equation (9) modified: Influence of memorized signs.
 
     Unlike F_eik this is a persistent memory-based attraction.
+
+    Args:
+        mem_signs: Positions of the memorized signs, shape (M, 2).
     """
-    force = np.zeros(2)
-    for P_k in mem_signs:
-        dir_vec = P_k - x_i
-        dist = np.linalg.norm(dir_vec)
-        if dist > 0:
-            force += eta * dir_vec / dist
-    return force
+    to_sign = np.asarray(mem_signs, dtype=float).reshape(-1, 2) - x_i
+    dist = np.hypot(to_sign[:, 0], to_sign[:, 1])
+    keep = dist > 0
+    return eta * ((1 / dist[keep]) @ to_sign[keep])
 
 
-def F_gi(
-    x_i: np.ndarray, exit_polygons: List[Polygon], strength: float = 0.5
-) -> np.ndarray:
-    """Equation (9): Attraction toward exit polygon centroid."""
-    if not exit_polygons:
-        return np.zeros(2)
-    center = np.array(exit_polygons[0].centroid.coords[0])
-    return strength * normalize(center - x_i)
+def F_gi(x_i: np.ndarray, exit_center: np.ndarray, strength: float = 0.5) -> np.ndarray:
+    """Equation (9): Attraction toward an exit center.
+
+    The exit centers are static, see Environment.exit_centers. x_i and
+    exit_center may also be arrays of shape (N, 2), one row per agent.
+    """
+    to_exit = np.asarray(exit_center, dtype=float) - x_i
+    norm = np.hypot(to_exit[..., 0], to_exit[..., 1])[..., None]
+    return strength * np.divide(
+        to_exit, norm, out=np.zeros_like(to_exit), where=norm > 0
+    )
 
 
 def F_hi(
@@ -299,7 +472,7 @@ def F_hi(
     - A force vector pointing from the panic site to the individual, with magnitude `strength`.
     """
     direction = x_i - x_panic
-    distance = np.linalg.norm(direction)
+    distance = math.hypot(*direction)
     if distance == 0 or distance > cuttof:
         return np.zeros_like(x_i)  # no direction if exactly at panic site
 
@@ -307,12 +480,24 @@ def F_hi(
 
 
 def F_31(
-    di: float, bwi: float, q1: float = 1.0, q2: float = 2.0, d: float = 1.0
+    di: float,
+    bwi: float,
+    q1: float = 1.0,
+    q2: float = 2.0,
+    d: float = 1.0,
+    unit: np.ndarray = None,
 ) -> np.ndarray:
-    """Equation (11): Random fluctuation force."""
-    if di > d:
-        return q1 * random_unit()
-    elif bwi > 0:
-        return q2 * random_unit()
-    else:
-        return q1 * random_unit()
+    """Equation (11): Random fluctuation force.
+
+    The magnitude is q2 if the agent is pushed by a wall (di <= d, bwi > 0),
+    otherwise q1. di and bwi may also be arrays of shape (N,), one entry per
+    agent, with `unit` of shape (N, 2).
+
+    Args:
+        unit: Random unit vector(s), e.g. drawn in one batch with
+            `random_units`. Drawn with `random_unit` if not given.
+    """
+    if unit is None:
+        unit = random_unit()
+    q = np.where((di <= d) & (bwi > 0), q2, q1)
+    return q[..., None] * unit
@@ -0,0 +1,215 @@
+"""Numba kernels of the pairwise interaction forces
+
+The kernels compute the same forces as F_bi and F_ci in forces.py, but in a
+single fused loop over the neighbors without temporary arrays. numba is
+optional: without it, HAS_NUMBA is False and the kernels run as plain Python,
+so callers should only select them if HAS_NUMBA is True.
+"""
+
+import math
+import numpy as np
+from functools import lru_cache
+from typing import Tuple
+
+from .parameters import AllForceParameters
+
+try:
+    from numba import njit, prange
+
+    HAS_NUMBA = True
+except ImportError:
+    HAS_NUMBA = False
+    prange = range
+
+    def njit(*args, **kwargs):
+        if len(args) == 1 and callable(args[0]):
+            return args[0]
+        return lambda func: func
+
+
+@lru_cache(maxsize=None)
+def pack_parameters(
+    params: AllForceParameters,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Pack the c1, h1, c2 and h2 parameters into flat float64 arrays.
+
+    The parameters are frozen, so the packed arrays are cached per params
+    and made read-only.
+    """
+    c1, h1, c2h2 = params.c1, params.h1, params.c2h2
+    c1p = np.array([c1.cn0, c1.cr0, c1.beta, c1.nu, c1.gamma, c1.epsilon])
+    h1p = np.array([h1.hr0, h1.lam, h1.sigma])
+    angles = [c2h2.phi1, c2h2.phi2, c2h2.phi3, c2h2.phi4]
+    # the angular functions are evaluated from cos(phi), see _angular
+    cosines = np.cos(angles).tolist()
+    c2p = np.array([c2h2.cphi1, c2h2.cphi2, *angles, *cosines])
+    h2p = np.array([c2h2.hphi1, c2h2.hphi2, *angles, *cosines])
+    for packed in (c1p, h1p, c2p, h2p):
+        packed.flags.writeable = False
+    return c1p, h1p, c2p, h2p
+
+
+@njit(inline="always")
+def normalize2(x, y):
+    """Unit vector of (x, y), or (0, 0) if it vanishes."""
+    n = math.sqrt(x * x + y * y)
+    if n > 0:
+        return x / n, y / n
+    return 0.0, 0.0
+
+
+@njit
+def _c1(r, c1p):
+    # branchless sum of clipped linear ramps
+    cn0, cr0, beta, nu, gamma, epsilon = c1p[0], c1p[1], c1p[2], c1p[3], c1p[4], c1p[5]
+    near = min(max(1 - r / beta, 0.0), 1.0)
+    rise = min(max((r - beta) / (nu - beta), 0.0), 1.0)
+    fall = min(max((epsilon - r) / (epsilon - gamma), 0.0), 1.0)
+    return cn0 * near + cr0 * min(rise, fall)
+
+
+@njit
+def _h1(r, h1p):
+    hr0, lam, sigma = h1p[0], h1p[1], h1p[2]
+    return hr0 * min(max((sigma - r) / (sigma - lam), 0.0), 1.0)
+
+
+@njit
+def _angular(cos_phi, p):
+    """c2 or h2 of the angle phi = arccos(cos_phi), depending on the packed parameters.
+
+    cos is decreasing on [0, pi], so phi < phi_k <=> cos_phi > cos(phi_k).
+    The arccos is only evaluated on the two linear ramps.
+    """
+    f1, f2, phi1, phi2, phi3, phi4 = p[0], p[1], p[2], p[3], p[4], p[5]
+    if cos_phi > p[6]:
+        return f1
+    elif cos_phi > p[7]:
+        return f1 - (f1 - f2) * (math.acos(cos_phi) - phi1) / (phi2 - phi1)
+    elif cos_phi > p[8]:
+        return f2
+    elif cos_phi > p[9]:
+        return f2 * (1 - (math.acos(cos_phi) - phi3) / (phi4 - phi3))
+    else:
+        return 0.0
+
+
+@njit(fastmath=True)
+def _pair_sums(x, v, X, V, neighbors, c1p, h1p, c2p, h2p):
+    """Unnormalized sums of F_bi and F_ci over the rows `neighbors` of X, V."""
+    bx = by = cx = cy = 0.0
+    # unit velocity computed once; an agent at rest sees all neighbors at angle 0
+    vx, vy = normalize2(v[0], v[1])
+    at_rest = vx == 0.0 and vy == 0.0
+    for j in neighbors:
+        dx = X[j, 0] - x[0]
+        dy = X[j, 1] - x[1]
+        dist = math.sqrt(dx * dx + dy * dy)
+        if dist > 0:
+            ux, uy = dx / dist, dy / dist
+            cos_phi = 1.0 if at_rest else min(1.0, max(-1.0, ux * vx + uy * vy))
+            c = _c1(dist, c1p) * _angular(cos_phi, c2p)
+            bx += c * ux
+            by += c * uy
+            h = _h1(dist, h1p) * _angular(cos_phi, h2p)
+            cx += h * (V[j, 0] - v[0])
+            cy += h * (V[j, 1] - v[1])
+    return bx, by, cx, cy
+
+
+@njit(fastmath=True)
+def bi_ci_kernel(x, v, X_others, V_others, c1p, h1p, c2p, h2p, out_b, out_c):
+    """Accumulate the unnormalized sums of F_bi and F_ci into out_b, out_c."""
+    neighbors = np.arange(X_others.shape[0])
+    out_b[0], out_b[1], out_c[0], out_c[1] = _pair_sums(
+        x, v, X_others, V_others, neighbors, c1p, h1p, c2p, h2p
+    )
+
+
+@njit(fastmath=True, parallel=True)
+def bi_ci_all(X, V, neighbor_idx, neighbor_offsets, c1p, h1p, c2p, h2p, out_b, out_c):
+    """bi_ci_kernel for all agents, in parallel over the agents.
+
+    The neighbors of agent i are neighbor_idx[neighbor_offsets[i]:neighbor_offsets[i + 1]]
+    (compressed sparse rows). Each agent only writes its own rows of out_b, out_c.
+    """
+    for i in prange(X.shape[0]):
+        neighbors = neighbor_idx[neighbor_offsets[i] : neighbor_offsets[i + 1]]
+        out_b[i, 0], out_b[i, 1], out_c[i, 0], out_c[i, 1] = _pair_sums(
+            X[i], V[i], X, V, neighbors, c1p, h1p, c2p, h2p
+        )
+
+
+def F_bi_ci(
+    x_i: np.ndarray,
+    v_i: np.ndarray,
+    X_others: np.ndarray,
+    V_others: np.ndarray,
+    params: AllForceParameters,
+    n_others: int = None,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Equations (4) and (5): F_bi and F_ci computed by `bi_ci_kernel`.
+
+    Args:
+        x_i: Position of agent i
+        v_i: Velocity of agent i
+        X_others: Positions of the neighboring agents, shape (M, 2)
+        V_others: Velocities of the neighboring agents, shape (M, 2)
+        n_others: Number of other agents normalizing F_ci, defaults to M.
+
+    Returns:
+        (f_bi, f_ci): Repulsion and cohesion force vectors
+    """
+    M = len(X_others) if n_others is None else n_others
+    f_bi = np.zeros(2)
+    f_ci = np.zeros(2)
+    if len(X_others) == 0:
+        return f_bi, f_ci
+
+    bi_ci_kernel(
+        np.asarray(x_i, dtype=np.float64),
+        np.asarray(v_i, dtype=np.float64),
+        np.ascontiguousarray(X_others, dtype=np.float64),
+        np.ascontiguousarray(V_others, dtype=np.float64),
+        *pack_parameters(params),
+        f_bi,
+        f_ci,
+    )
+    return f_bi, f_ci / M
+
+
+def F_bi_ci_all(
+    X: np.ndarray,
+    V: np.ndarray,
+    neighbor_idx: np.ndarray,
+    neighbor_offsets: np.ndarray,
+    params: AllForceParameters,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Equations (4) and (5) for all agents, computed by `bi_ci_all`.
+
+    Args:
+        X: Positions of all agents, shape (N, 2)
+        V: Velocities of all agents, shape (N, 2)
+        neighbor_idx: Concatenated neighbor indices of all agents
+        neighbor_offsets: Start of the neighbors of agent i in neighbor_idx,
+            shape (N + 1,)
+
+    Returns:
+        (F_b, F_c): Repulsion and cohesion forces, shape (N, 2) each
+    """
+    n = len(X)
+    F_b = np.zeros((n, 2))
+    F_c = np.zeros((n, 2))
+    if n < 2:
+        return F_b, F_c
+
+    bi_ci_all(
+        np.ascontiguousarray(X, dtype=np.float64),
+        np.ascontiguousarray(V, dtype=np.float64),
+        np.asarray(neighbor_idx, dtype=np.int64),
+        np.asarray(neighbor_offsets, dtype=np.int64),
+        *pack_parameters(params),
+        F_b,
+        F_c,
+    )
+    return F_b, F_c / (n - 1)
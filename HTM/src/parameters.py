@@ -1,8 +1,8 @@
 import numpy as np
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class ForceParameters:
     # Driving force
     a: float = 1.0
@@ -27,11 +27,12 @@ class ForceParameters:
     cutoff_hi: float = 20
     sign_vision_radius: float = 1.5
     fov_angle: float = np.pi * 2 / 3  # 120 degrees
+    sign_fov_angle: float = np.pi * 0.5  # opening of the sign's cone, 90 degrees
 
     exit_domain_radius: float = 4.0
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class C1Parameters:
     cn0: float = -0.5
     cr0: float = 1.0
@@ -41,14 +42,14 @@ class C1Parameters:
     epsilon: float = 3.0
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class H1Parameters:
     hr0: float = 1.0
     lam: float = 1.5
     sigma: float = 2.5
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class C2H2Parameters:
     phi1: float = np.pi / 6
     phi2: float = np.pi / 3
@@ -60,10 +61,14 @@ class C2H2Parameters:
     hphi2: float = 0.5
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class AllForceParameters:
-    force: ForceParameters
-    c1: C1Parameters
-    h1: H1Parameters
-    c2h2: C2H2Parameters
-
+    force: ForceParameters = field(default_factory=ForceParameters)
+    c1: C1Parameters = field(default_factory=C1Parameters)
+    h1: H1Parameters = field(default_factory=H1Parameters)
+    c2h2: C2H2Parameters = field(default_factory=C2H2Parameters)
+
+    @property
+    def interaction_radius(self) -> float:
+        """Distance beyond which c1 and h1 vanish, i.e. agents do not interact."""
+        return max(self.c1.epsilon, self.h1.sigma)
@@ -1,3 +1,4 @@
+import math
 import numpy as np
 from shapely.geometry import Polygon, Point
 from shapely.geometry import LineString
@@ -7,7 +8,7 @@ from typing import List, Tuple
 # --- Utility Functions ---
 def normalize(v: np.ndarray) -> np.ndarray:
     """Normalize a vector. Returns a zero vector if norm is 0."""
-    norm = np.linalg.norm(v)
+    norm = math.hypot(*v)
     return v / norm if norm > 0 else np.zeros_like(v)
 
 
@@ -26,15 +27,72 @@ def extract_segments(polygon: Polygon) -> List[LineString]:
     return [LineString([coords[i], coords[i + 1]]) for i in range(len(coords) - 1)]
 
 
+def extract_segment_arrays(polygon: Polygon) -> Tuple[np.ndarray, np.ndarray]:
+    """Wall segments of a polygon as arrays of end points, shape (S, 2) each.
+
+    Same segments as extract_segments, without building a LineString per edge.
+    """
+    coords = np.asarray(polygon.exterior.coords, dtype=float)[:, :2].reshape(-1, 2)
+    return coords[:-1], coords[1:]
+
+
+def point_to_segments(
+    p: np.ndarray, starts: np.ndarray, ends: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Distances from a point to many segments and the closest points on them.
+
+    Args:
+        p: Point, shape (2,), or one point per segment, shape (S, 2).
+        starts: First end points of the segments, shape (S, 2).
+        ends: Second end points of the segments, shape (S, 2).
+
+    Returns:
+        (dists, closest_points) of shapes (S,) and (S, 2).
+    """
+    seg = ends - starts
+    len2 = (seg * seg).sum(axis=1)
+    t = ((p - starts) * seg).sum(axis=1) / np.where(len2 > 0, len2, 1.0)
+    closest_points = starts + np.clip(t, 0.0, 1.0)[:, None] * seg
+    diff = p - closest_points
+    return np.hypot(diff[:, 0], diff[:, 1]), closest_points
+
+
 def angle_between(v1: np.ndarray, v2: np.ndarray) -> float:
-    """Compute angle between two vectors."""
-    if np.linalg.norm(v1) == 0 or np.linalg.norm(v2) == 0:
-        return 0
-    cos_theta = np.clip(np.dot(normalize(v1), normalize(v2)), -1.0, 1.0)
-    return np.arccos(cos_theta)
+    """Compute angle between two 2D vectors, in [0, pi].
+
+    Computed as atan2(|v1 x v2|, v1 . v2), which needs no norms and is 0
+    if one of the vectors vanishes.
+    """
+    cross = v1[0] * v2[1] - v1[1] * v2[0]
+    dot = v1[0] * v2[0] + v1[1] * v2[1] + 0.0  # no -0.0, atan2(0, -0.0) = pi
+    return math.atan2(abs(cross), dot)
+
+
+def cosines_between(v1: np.ndarray, v2: np.ndarray) -> np.ndarray:
+    """Compute row-wise cosines of the angles between two stacks of vectors.
+
+    The cosine is 1 (angle 0) if one of the vectors vanishes, as in
+    `angle_between`. Since arccos is decreasing on [-1, 1], comparing
+    cosines is equivalent to comparing angles and avoids the arccos.
+    """
+    v1 = np.asarray(v1, dtype=float)
+    v2 = np.asarray(v2, dtype=float)
+    norms = np.hypot(v1[..., 0], v1[..., 1]) * np.hypot(v2[..., 0], v2[..., 1])
+    dots = np.einsum("...j,...j->...", v1, v2)  # no (..., 2) temporary
+    cos_theta = np.divide(dots, norms, out=np.ones_like(dots), where=norms > 0)
+    return np.clip(cos_theta, -1.0, 1.0)
+
+
+def random_unit(rng: np.random.Generator = None) -> np.ndarray:
+    """Return a random unit vector.
+
+    Drawn from rng if given, otherwise from the global np.random state.
+    """
+    angle = (rng or np.random).uniform(0, 2 * np.pi)
+    return np.array([math.cos(angle), math.sin(angle)])
 
 
-def random_unit() -> np.ndarray:
-    """Return a random unit vector."""
-    angle = np.random.uniform(0, 2 * np.pi)
-    return np.array([np.cos(angle), np.sin(angle)])
+def random_units(n: int, rng: np.random.Generator) -> np.ndarray:
+    """Return n random unit vectors, shape (n, 2)."""
+    angle = rng.uniform(0, 2 * np.pi, n)
+    return np.column_stack((np.cos(angle), np.sin(angle)))